@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, exists, insert, literal, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from database import background_session
+from dedup import tender_index, reassign_canonicals
+from models import (
+    Tender, ArchivedTender, TenderDocument, ArchivedTenderDocument, TenderAnalysis, ArchivedTenderAnalysis
+)
+
+SWEEP_INTERVAL_SECONDS = float(os.getenv("TENDER_SWEEP_INTERVAL", "300"))
+SWEEP_BATCH_SIZE = int(os.getenv("TENDER_SWEEP_BATCH_SIZE", "500"))
+ARCHIVE_AFTER_MONTHS = int(os.getenv("TENDER_ARCHIVE_AFTER_MONTHS", "6"))
+ARCHIVABLE_STATUSES = ("closed", "awarded")
+
+logger = logging.getLogger(__name__)
+
+
+async def close_expired_tenders(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Mark open tenders past their deadline as closed, one indexed batch at a time"""
+    now = now or datetime.utcnow()
+    closed = 0
+    while True:
+        async with db.begin():
+            result = await db.execute(
+                select(Tender.id)
+                .where(Tender.status == "open", Tender.deadline < now)
+                .limit(SWEEP_BATCH_SIZE)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                break
+            await db.execute(
+                update(Tender).where(Tender.id.in_(ids)).values(status="closed")
+                .execution_options(synchronize_session=False)
+            )
+        closed += len(ids)
+        if len(ids) < SWEEP_BATCH_SIZE:
+            break
+    return closed
+
+
+async def find_tender(db: AsyncSession, tender_id: str):
+    """Look a tender up in the hot table, falling back to the archive"""
+    for model in (Tender, ArchivedTender):
+        result = await db.execute(select(model).where(model.id == tender_id))
+        tender = result.scalars().first()
+        if tender:
+            return tender
+    return None
+
+
+async def find_document(db: AsyncSession, document_id: str):
+    """Look a tender document up in the hot table, falling back to the archive"""
+    for model in (TenderDocument, ArchivedTenderDocument):
+        result = await db.execute(select(model).where(model.id == document_id))
+        document = result.scalars().first()
+        if document:
+            return document
+    return None
+
+
+def document_model_for(tender):
+    return ArchivedTenderDocument if isinstance(tender, ArchivedTender) else TenderDocument
+
+
+def analysis_model_for(tender):
+    return ArchivedTenderAnalysis if isinstance(tender, ArchivedTender) else TenderAnalysis
+
+
+def _shared_columns(hot, cold):
+    return [column.name for column in hot.__table__.columns if column.name in cold.__table__.columns]
+
+
+async def _copy_rows(db: AsyncSession, hot, cold, condition, extra: Optional[dict] = None):
+    """Upsert matching hot rows into the cold table.
+
+    A tender can be re-ingested after an earlier version was archived, so ids
+    already in the cold table are overwritten from the hot row in place (their
+    archived children keep a valid parent), and the rest are inserted.
+    """
+    names = _shared_columns(hot, cold)
+    extra = extra or {}
+    hot_columns = hot.__table__.c
+    await db.execute(
+        update(cold)
+        .where(cold.id.in_(select(hot.id).where(condition)))
+        .values({
+            **{name: select(hot_columns[name]).where(hot.id == cold.id).scalar_subquery()
+               for name in names if name != "id"},
+            **extra,
+        })
+        .execution_options(synchronize_session=False)
+    )
+    values = [hot_columns[name] for name in names] + [literal(value) for value in extra.values()]
+    already_archived = exists().where(cold.id == hot.id)
+    await db.execute(
+        insert(cold).from_select(names + list(extra), select(*values).where(condition, ~already_archived))
+    )
+
+
+async def _delete_copied(db: AsyncSession, hot, cold, condition) -> int:
+    """Delete matching hot rows, but only those whose copy exists in the cold table"""
+    result = await db.execute(
+        delete(hot)
+        .where(condition, exists().where(cold.id == hot.id))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def archive_closed_tenders(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Move tenders whose deadline passed more than ARCHIVE_AFTER_MONTHS ago to the cold tables.
+
+    Each batch copies the tenders, moves their documents and analyses, re-points
+    hot duplicates at a new canonical tender and deletes the hot rows in one
+    transaction. The in-memory dedup index is only touched once that commits.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=30 * ARCHIVE_AFTER_MONTHS)
+    archived = 0
+    while True:
+        async with db.begin():
+            result = await db.execute(
+                select(Tender.id)
+                .where(Tender.status.in_(ARCHIVABLE_STATUSES), Tender.deadline < cutoff)
+                .limit(SWEEP_BATCH_SIZE)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                break
+
+            cluster_changes = await reassign_canonicals(db, ids)
+            await _copy_rows(db, Tender, ArchivedTender, Tender.id.in_(ids), {"archived_at": now})
+            for hot, cold in ((TenderDocument, ArchivedTenderDocument), (TenderAnalysis, ArchivedTenderAnalysis)):
+                await _copy_rows(db, hot, cold, hot.tender_id.in_(ids))
+                await _delete_copied(db, hot, cold, hot.tender_id.in_(ids))
+            moved = await _delete_copied(db, Tender, ArchivedTender, Tender.id.in_(ids))
+
+        for tender_id in ids:
+            tender_index.remove(tender_id)
+        for tender_id, cluster_id in cluster_changes.items():
+            tender_index.set_cluster(tender_id, cluster_id)
+        archived += moved
+        if len(ids) < SWEEP_BATCH_SIZE or not moved:
+            break
+    return archived
+
+
+async def sweep_tenders():
+    """Run one close-then-archive pass on the background engine"""
+    async with background_session() as db:
+        closed = await close_expired_tenders(db)
+        archived = await archive_closed_tenders(db)
+    if closed or archived:
+        logger.info("Tender sweep closed %d and archived %d tenders", closed, archived)
+    return closed, archived
+
+
+async def run_sweeper(interval: float = SWEEP_INTERVAL_SECONDS):
+    """Background loop started from the app lifespan"""
+    while True:
+        try:
+            await sweep_tenders()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Tender sweep failed")
+        await asyncio.sleep(interval)
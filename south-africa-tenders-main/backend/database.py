@@ -1,6 +1,7 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./tenders.db")
@@ -14,6 +15,17 @@ engine = create_async_engine(
 
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Background jobs get their own connection. With StaticPool every request
+# session shares one SQLite connection, so a request closing mid-job would
+# roll back the job's uncommitted work. An in-memory database cannot be shared
+# across connections, so it keeps the single engine.
+if DATABASE_URL.startswith("sqlite") and ":memory:" not in DATABASE_URL:
+    background_engine = create_async_engine(DATABASE_URL, poolclass=NullPool, echo=True)
+else:
+    background_engine = engine
+
+background_session = sessionmaker(background_engine, class_=AsyncSession, expire_on_commit=False)
+
 async def get_db():
     async with async_session() as session:
         try:
@@ -21,7 +33,27 @@ async def get_db():
         finally:
             await session.close()
 
+def add_missing_columns(conn, metadata):
+    """Add columns and indexes declared since a table was first created.
+
+    ``create_all`` only creates missing tables, so existing databases would
+    otherwise fail with "no such column". Safe to run on every startup.
+    """
+    inspector = inspect(conn)
+    for table in metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(conn)
+
 async def create_tables():
     from models import Base
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns, Base.metadata)
@@ -0,0 +1,251 @@
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from models import Tender
+
+# Republications with a sentence appended or a word changed score around
+# 0.8 on word bigrams, while distinct tenders from the same template stay
+# below 0.4. 32 bands of 4 rows make pairs at the 0.6 cutoff candidates with
+# ~99% probability; candidates are then verified against the full signature.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+DUPLICATE_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(*parts: Optional[str]) -> List[str]:
+    """Lowercase and tokenize text, dropping punctuation and whitespace differences"""
+    tokens = []
+    for part in parts:
+        if part:
+            tokens.extend(_TOKEN_RE.findall(part.lower()))
+    return tokens
+
+
+def shingles(tokens: List[str], size: int = SHINGLE_SIZE) -> Set[str]:
+    """Word n-grams of the token stream"""
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def minhash_signature(shingle_set: Iterable[str]) -> Optional[List[int]]:
+    """Compute a NUM_PERM-long MinHash signature, or None for an empty shingle set"""
+    hashes = [_hash_shingle(s) for s in shingle_set]
+    if not hashes:
+        return None
+    signature = []
+    for a, b in _PERMUTATIONS:
+        signature.append(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes))
+    return signature
+
+
+def tender_signature(tender: Tender) -> Optional[List[int]]:
+    """MinHash signature over a tender's normalized title, description and buyer.
+
+    Tenders without any text get None: their signatures would all be equal
+    and link every empty tender into one cluster.
+    """
+    return text_signature(tender.title, tender.description, tender.buyer)
+
+
+def text_signature(title: Optional[str], description: Optional[str], buyer: Optional[str]) -> Optional[List[int]]:
+    """``tender_signature`` for callers that only loaded the text columns"""
+    tokens = normalize_text(title, description, buyer)
+    return minhash_signature(shingles(tokens))
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return matches / NUM_PERM
+
+
+class LSHIndex:
+    """Banded LSH index over MinHash signatures with duplicate cluster tracking"""
+
+    def __init__(self, bands: int = BANDS, rows: int = ROWS):
+        self.bands = bands
+        self.rows = rows
+        self.buckets: List[Dict[Tuple[int, ...], Set[str]]] = [{} for _ in range(bands)]
+        self.signatures: Dict[str, List[int]] = {}
+        self.clusters: Dict[str, str] = {}
+
+    def _band_keys(self, signature: List[int]):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def candidates(self, signature: List[int]) -> Set[str]:
+        found: Set[str] = set()
+        for band, key in self._band_keys(signature):
+            found.update(self.buckets[band].get(key, ()))
+        return found
+
+    def find_duplicate(self, signature: List[int], threshold: float = DUPLICATE_THRESHOLD) -> Optional[str]:
+        """Return the cluster id of the most similar indexed tender above threshold"""
+        best_id, best_score = None, threshold
+        for candidate_id in self.candidates(signature):
+            score = estimate_similarity(signature, self.signatures[candidate_id])
+            if score >= best_score:
+                best_id, best_score = candidate_id, score
+        if best_id is None:
+            return None
+        return self.clusters[best_id]
+
+    def insert(self, tender_id: str, signature: List[int], cluster_id: Optional[str] = None):
+        if tender_id in self.signatures:
+            self.remove(tender_id)
+        self.signatures[tender_id] = signature
+        self.clusters[tender_id] = cluster_id or tender_id
+        for band, key in self._band_keys(signature):
+            self.buckets[band].setdefault(key, set()).add(tender_id)
+
+    def remove(self, tender_id: str):
+        signature = self.signatures.pop(tender_id, None)
+        if signature is None:
+            return
+        self.clusters.pop(tender_id, None)
+        for band, key in self._band_keys(signature):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(tender_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    def set_cluster(self, tender_id: str, cluster_id: Optional[str]):
+        if tender_id in self.clusters:
+            self.clusters[tender_id] = cluster_id or tender_id
+
+    def clear(self):
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures.clear()
+        self.clusters.clear()
+
+
+tender_index = LSHIndex()
+
+
+def register_tender(tender: Tender) -> Optional[str]:
+    """Ingest-time dedup: sign the tender, link it to an existing cluster and index it.
+
+    Sets ``tender.minhash`` and ``tender.duplicate_of`` and returns the canonical
+    tender id when a near-duplicate was found. Tenders without text are never
+    linked or indexed.
+    """
+    signature = tender_signature(tender)
+    if signature is None:
+        tender.minhash = None
+        tender.duplicate_of = None
+        return None
+    canonical_id = tender_index.find_duplicate(signature)
+    if canonical_id == tender.id:
+        canonical_id = None
+    tender.minhash = signature
+    tender.duplicate_of = canonical_id
+    tender_index.insert(tender.id, signature, canonical_id)
+    return canonical_id
+
+
+async def rebuild_index(db: AsyncSession):
+    """Load stored tender signatures into the in-memory LSH index.
+
+    Tenders stored without a signature are signed and clustered the way
+    ``register_tender`` would have done at ingest, oldest first, and the
+    result is written back.
+    """
+    tender_index.clear()
+    result = await db.execute(
+        select(Tender.id, Tender.minhash, Tender.duplicate_of).order_by(Tender.published_date)
+    )
+    unsigned = []
+    for tender_id, signature, duplicate_of in result.all():
+        if signature:
+            tender_index.insert(tender_id, signature, duplicate_of)
+        else:
+            unsigned.append(tender_id)
+    if not unsigned:
+        return
+
+    result = await db.execute(
+        select(Tender.id, Tender.title, Tender.description, Tender.buyer)
+        .where(Tender.id.in_(unsigned))
+        .order_by(Tender.published_date)
+    )
+    for tender_id, title, description, buyer in result.all():
+        signature = text_signature(title, description, buyer)
+        if signature is None:
+            continue
+        canonical_id = tender_index.find_duplicate(signature)
+        tender_index.insert(tender_id, signature, canonical_id)
+        await db.execute(
+            update(Tender).where(Tender.id == tender_id)
+            .values(minhash=signature, duplicate_of=canonical_id)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+
+async def reassign_canonicals(db: AsyncSession, leaving_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Re-point hot duplicates of tenders that are leaving the hot table.
+
+    The earliest published remaining member of each affected cluster becomes
+    its canonical tender. Returns ``{tender_id: new duplicate_of}`` so the
+    caller can update the LSH index once the transaction commits.
+    """
+    result = await db.execute(
+        select(Tender.id, Tender.duplicate_of)
+        .where(Tender.duplicate_of.in_(leaving_ids), Tender.id.notin_(leaving_ids))
+        .order_by(Tender.published_date)
+    )
+    changes: Dict[str, Optional[str]] = {}
+    new_canonicals: Dict[str, str] = {}
+    for tender_id, old_canonical in result.all():
+        new_canonical = new_canonicals.setdefault(old_canonical, tender_id)
+        changes[tender_id] = None if new_canonical == tender_id else new_canonical
+
+    for old_canonical, new_canonical in new_canonicals.items():
+        await db.execute(
+            update(Tender).where(Tender.id == new_canonical).values(duplicate_of=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            update(Tender)
+            .where(Tender.duplicate_of == old_canonical, Tender.id.notin_(leaving_ids))
+            .values(duplicate_of=new_canonical)
+            .execution_options(synchronize_session=False)
+        )
+    return changes
+
+
+def collapse_clusters(tenders: Iterable[Tender]) -> List[Tender]:
+    """Keep one tender per duplicate cluster, preferring the canonical tender"""
+    chosen: Dict[str, Tender] = {}
+    for tender in tenders:
+        cluster_id = tender.duplicate_of or tender.id
+        current = chosen.get(cluster_id)
+        if current is None or (tender.id == cluster_id and current.id != cluster_id):
+            chosen[cluster_id] = tender
+    return list(chosen.values())
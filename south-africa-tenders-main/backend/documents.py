@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+import httpx
+from fastapi import HTTPException, Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", "./document_cache")
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOCUMENT_DOWNLOAD_TIMEOUT", "60"))
+CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "zip": "application/zip",
+}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class DocumentStore:
+    """Content-addressed on-disk cache of tender documents with LRU eviction.
+
+    Files live at ``<root>/<sha[:2]>/<sha>`` so identical documents published
+    under several tenders are stored once. Recency is tracked in memory and
+    seeded from file modification times on startup.
+
+    Entries handed out by ``get`` and ``fetch`` are pinned until ``release``
+    is called, and eviction never removes a pinned file, so a document cannot
+    disappear while it is being served.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Callers awaiting each download, keyed by task so a retry of the same
+        # URL never inherits a failed download's count
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    def load(self):
+        """Index documents already on disk and drop partial downloads"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(exist_ok=True)
+        for leftover in tmp_dir.iterdir():
+            leftover.unlink(missing_ok=True)
+
+        found = []
+        for path in self.root.glob("??/*"):
+            stat = path.stat()
+            found.append((stat.st_mtime, path.name, stat.st_size))
+        self._entries.clear()
+        self.total_bytes = 0
+        for _, content_hash, size in sorted(found):
+            self._entries[content_hash] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path_for(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / content_hash
+
+    def get(self, content_hash: Optional[str]) -> Optional[Path]:
+        """Return and pin the cached file for a hash, marking it most recently used"""
+        if not content_hash or content_hash not in self._entries:
+            return None
+        self._entries.move_to_end(content_hash)
+        self._pin(content_hash)
+        return self.path_for(content_hash)
+
+    def _pin(self, content_hash: str, count: int = 1):
+        self._pins[content_hash] = self._pins.get(content_hash, 0) + count
+
+    def release(self, content_hash: str):
+        """Drop one pin taken by ``get`` or ``fetch``"""
+        remaining = self._pins.get(content_hash, 0) - 1
+        if remaining > 0:
+            self._pins[content_hash] = remaining
+            return
+        self._pins.pop(content_hash, None)
+        self._evict()
+
+    async def fetch(self, url: str) -> Tuple[str, int, Path]:
+        """Download and pin a document, coalescing concurrent fetches of one URL"""
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._inflight[url] = task
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            content_hash, size = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # _download pins once per waiter when it succeeds; give ours back.
+            # A failed download has already dropped its waiter count.
+            if task.done() and not task.cancelled() and task.exception() is None:
+                self.release(task.result()[0])
+            elif task in self._waiters:
+                self._waiters[task] -= 1
+            raise
+        return content_hash, size, self.path_for(content_hash)
+
+    async def _download(self, url: str) -> Tuple[str, int]:
+        task = asyncio.current_task()
+        tmp_path = self.root / "tmp" / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=DOWNLOAD_TIMEOUT_SECONDS) as client:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    async with await anyio.open_file(tmp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            digest.update(chunk)
+                            size += len(chunk)
+                            await f.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            self._inflight.pop(url, None)
+            self._waiters.pop(task, None)
+            raise
+
+        content_hash = digest.hexdigest()
+        final_path = self.path_for(content_hash)
+        if content_hash in self._entries:
+            tmp_path.unlink(missing_ok=True)
+        else:
+            final_path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, final_path)
+            self.total_bytes += size
+        self._entries[content_hash] = size
+        self._entries.move_to_end(content_hash)
+        # Pin for every caller awaiting this download before anything can evict it.
+        # Later callers start a fresh fetch rather than joining a finished one.
+        self._inflight.pop(url, None)
+        self._pin(content_hash, self._waiters.pop(task, 0))
+        self._evict()
+        return content_hash, size
+
+    def _evict(self):
+        """Drop least recently used unpinned files until the store fits its cap"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for content_hash in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if content_hash in self._pins:
+                continue
+            size = self._entries.pop(content_hash)
+            self.path_for(content_hash).unlink(missing_ok=True)
+            self.total_bytes -= size
+
+
+document_store = DocumentStore(DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive offsets.
+
+    Returns None for headers we ignore (multiple ranges, other units) and
+    raises 416 for unsatisfiable ranges, which is every range of an empty file.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if size == 0:
+        raise _range_not_satisfiable(size)
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            raise _range_not_satisfiable(size)
+        return max(size - suffix, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise _range_not_satisfiable(size)
+    return start, min(end, size - 1)
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+class _ReleaseOnCompletion:
+    """Response mixin that runs ``release`` once the body is sent or the send fails"""
+
+    release: Optional[Callable[[], None]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.release is not None:
+                self.release()
+
+
+class PinnedFileResponse(_ReleaseOnCompletion, FileResponse):
+    pass
+
+
+class PinnedStreamingResponse(_ReleaseOnCompletion, StreamingResponse):
+    pass
+
+
+async def _iter_file_range(path: Path, start: int, end: int):
+    remaining = end - start + 1
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def document_response(request: Request, path: Path, filename: str, doc_type: str,
+                      release: Callable[[], None]) -> Response:
+    """Serve a pinned cached document, honouring a single HTTP Range if requested.
+
+    ``release`` unpins the document; it runs when the response completes, or
+    immediately if no response is produced.
+    """
+    try:
+        response = _build_document_response(request, path, filename, doc_type)
+    except BaseException:
+        release()
+        raise
+    response.release = release
+    return response
+
+
+def _build_document_response(request: Request, path: Path, filename: str, doc_type: str) -> Response:
+    media_type = CONTENT_TYPES.get(doc_type, "application/octet-stream")
+    size = path.stat().st_size
+    byte_range = None
+    if "range" in request.headers:
+        byte_range = parse_range(request.headers["range"], size)
+
+    if byte_range is None:
+        response = PinnedFileResponse(path, media_type=media_type, filename=filename)
+        response.headers["Accept-Ranges"] = "bytes"
+        return response
+
+    start, end = byte_range
+    quoted = quote(filename)
+    if quoted != filename:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        disposition = f'attachment; filename="{filename}"'
+    return PinnedStreamingResponse(
+        _iter_file_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Disposition": disposition,
+        },
+    )
@@ -0,0 +1,94 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+FACET_CACHE_TTL_SECONDS = 30
+FACET_CACHE_MAX_ENTRIES = 256
+
+# Upper bounds (exclusive) on Tender.budget_max, in ZAR
+BUDGET_BUCKETS = [
+    (1_000_000, "0-1M"),
+    (5_000_000, "1M-5M"),
+    (10_000_000, "5M-10M"),
+    (50_000_000, "10M-50M"),
+    (float("inf"), "50M+"),
+]
+BUDGET_LABELS = [label for _, label in BUDGET_BUCKETS] + ["unknown"]
+
+
+def budget_bucket(budget_max: Optional[float]) -> str:
+    if budget_max is None:
+        return "unknown"
+    for upper, label in BUDGET_BUCKETS:
+        if budget_max < upper:
+            return label
+    return BUDGET_BUCKETS[-1][1]
+
+
+class FacetCache:
+    """Small TTL cache for facet counts keyed by the normalized filter set"""
+
+    def __init__(self, ttl: float = FACET_CACHE_TTL_SECONDS, max_entries: int = FACET_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Dict[str, Any]):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+facet_cache = FacetCache()
+
+
+def _sorted_counts(counter: Counter) -> Dict[str, int]:
+    return dict(counter.most_common())
+
+
+async def compute_facets(db: AsyncSession, query) -> Dict[str, Any]:
+    """Count provinces, categories, status and budget buckets in a single scan.
+
+    ``query`` must select ``Tender.province``, ``Tender.status``,
+    ``Tender.categories`` and ``Tender.budget_max`` in that order, with the
+    caller's filters already applied.
+    """
+    provinces: Counter = Counter()
+    categories: Counter = Counter()
+    statuses: Counter = Counter()
+    budgets: Counter = Counter()
+    total = 0
+
+    result = await db.stream(query)
+    async for province, status, tender_categories, budget_max in result:
+        total += 1
+        provinces[province] += 1
+        statuses[status] += 1
+        budgets[budget_bucket(budget_max)] += 1
+        for category in set(tender_categories or ()):
+            categories[category] += 1
+
+    return {
+        "total": total,
+        "provinces": _sorted_counts(provinces),
+        "categories": _sorted_counts(categories),
+        "status": _sorted_counts(statuses),
+        "budget": {label: budgets[label] for label in BUDGET_LABELS if budgets[label]},
+    }
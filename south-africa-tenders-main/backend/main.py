@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -7,23 +7,37 @@ import uvicorn
 from datetime import datetime, timedelta
 import json
 import uuid
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, union_all
+from sqlalchemy.orm.exc import StaleDataError
+import httpx
+import asyncio
 
 from database import get_db, create_tables
-from models import User, Organization, Tender, TenderDocument, TenderAnalysis
+from models import User, Organization, Tender, ArchivedTender, TenderDocument, TenderAnalysis
 from auth import authenticate_user, get_current_user, get_password_hash, create_access_token
+from dedup import register_tender, rebuild_index, collapse_clusters
+from documents import document_store, document_response
+from facets import facet_cache, compute_facets
+from ratelimit import RateLimitMiddleware
+from archive import run_sweeper, find_tender, find_document, document_model_for, analysis_model_for
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await create_tables()
+    document_store.load()
+    async for db in get_db():
+        await rebuild_index(db)
     await seed_initial_data()
+    sweeper = asyncio.create_task(run_sweeper())
     yield
     # Shutdown
-    pass
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
 
 app = FastAPI(
     title="Tender Insight Hub API",
@@ -32,6 +46,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rate limiting middleware (added before CORS so rejections still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -101,6 +118,7 @@ class TenderResponse(BaseModel):
     documents: Optional[List[TenderDocumentResponse]] = []
     source: str
     ocdsId: Optional[str] = None
+    duplicateOf: Optional[str] = None
 
 class SearchFilters(BaseModel):
     keywords: Optional[str] = None
@@ -115,10 +133,9 @@ class SearchFilters(BaseModel):
 
 async def seed_initial_data():
     async for db in get_db():
-        # Check if data already exists
-        result = await db.execute(select(Tender))
-        existing_tenders = result.scalars().all()
-        if existing_tenders:
+        # Check if data already exists (seeded tenders may since have been archived)
+        result = await db.execute(select(Organization).where(Organization.id == "sample-org"))
+        if result.scalars().first():
             break
 
         # Create sample tenders
@@ -187,6 +204,7 @@ async def seed_initial_data():
 
         db.add(sample_org)
         for tender in sample_tenders:
+            register_tender(tender)
             db.add(tender)
 
         await db.commit()
@@ -212,7 +230,8 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     organization = result.scalars().first()
 
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=timedelta(minutes=30)
+        data={"sub": user.email, "org": organization.id, "plan": organization.plan},
+        expires_delta=timedelta(minutes=30)
     )
 
     return {
@@ -284,7 +303,8 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     await db.commit()
 
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=timedelta(minutes=30)
+        data={"sub": user.email, "org": organization.id, "plan": organization.plan},
+        expires_delta=timedelta(minutes=30)
     )
 
     return {
@@ -311,55 +331,121 @@ async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db))
     }
 
 # Tender endpoints
-@app.get("/api/tenders", response_model=List[TenderResponse])
-async def get_tenders(
+def apply_tender_filters(
+    query,
     keywords: Optional[str] = None,
     provinces: Optional[str] = None,
-    categories: Optional[str] = None,
     budget_min: Optional[float] = None,
     budget_max: Optional[float] = None,
     deadline_from: Optional[str] = None,
     deadline_to: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    model=Tender,
 ):
-    """Get filtered list of tenders"""
-    query = select(Tender)
-
-    # Apply filters
+    """Apply the search query-string filters to a select over tenders (or ArchivedTender)"""
     if keywords:
         keywords_lower = f"%{keywords.lower()}%"
         query = query.where(
             or_(
-                func.lower(Tender.title).like(keywords_lower),
-                func.lower(Tender.description).like(keywords_lower),
+                func.lower(model.title).like(keywords_lower),
+                func.lower(model.description).like(keywords_lower),
                 # Note: For categories array, we'd need more complex filtering
             )
         )
 
     if provinces:
         province_list = provinces.split(",")
-        query = query.where(Tender.province.in_(province_list))
+        query = query.where(model.province.in_(province_list))
 
     if budget_min:
-        query = query.where(Tender.budget_max >= budget_min)
+        query = query.where(model.budget_max >= budget_min)
 
     if budget_max:
-        query = query.where(Tender.budget_min <= budget_max)
+        query = query.where(model.budget_min <= budget_max)
 
     if deadline_from:
-        query = query.where(Tender.deadline >= datetime.fromisoformat(deadline_from.replace('Z', '+00:00')))
+        query = query.where(model.deadline >= datetime.fromisoformat(deadline_from.replace('Z', '+00:00')))
 
     if deadline_to:
-        query = query.where(Tender.deadline <= datetime.fromisoformat(deadline_to.replace('Z', '+00:00')))
+        query = query.where(model.deadline <= datetime.fromisoformat(deadline_to.replace('Z', '+00:00')))
+
+    return query
+
+@app.get("/api/tenders/facets")
+async def get_tender_facets(
+    keywords: Optional[str] = None,
+    provinces: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    deadline_from: Optional[str] = None,
+    deadline_to: Optional[str] = None,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get province, category, status and budget counts for a filter set"""
+    cache_key = (
+        keywords.lower() if keywords else None,
+        tuple(sorted(provinces.split(","))) if provinces else None,
+        budget_min,
+        budget_max,
+        deadline_from,
+        deadline_to,
+        include_archived,
+    )
+    facets = facet_cache.get(cache_key)
+    if facets is None:
+        query = apply_tender_filters(
+            select(Tender.province, Tender.status, Tender.categories, Tender.budget_max),
+            keywords, provinces, budget_min, budget_max, deadline_from, deadline_to
+        )
+        if include_archived:
+            archived_query = apply_tender_filters(
+                select(ArchivedTender.province, ArchivedTender.status, ArchivedTender.categories, ArchivedTender.budget_max),
+                keywords, provinces, budget_min, budget_max, deadline_from, deadline_to, model=ArchivedTender
+            )
+            query = union_all(query, archived_query)
+        facets = await compute_facets(db, query)
+        facet_cache.set(cache_key, facets)
+    return facets
+
+@app.get("/api/tenders", response_model=List[TenderResponse])
+async def get_tenders(
+    keywords: Optional[str] = None,
+    provinces: Optional[str] = None,
+    categories: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    deadline_from: Optional[str] = None,
+    deadline_to: Optional[str] = None,
+    collapse_duplicates: bool = False,
+    include_archived: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get filtered list of tenders"""
+    query = apply_tender_filters(
+        select(Tender), keywords, provinces, budget_min, budget_max, deadline_from, deadline_to
+    )
 
     result = await db.execute(query)
-    tenders = result.scalars().all()
+    tenders = list(result.scalars().all())
+
+    # Archived tenders live in a separate cold table and are only searched on request
+    if include_archived:
+        archived_query = apply_tender_filters(
+            select(ArchivedTender), keywords, provinces, budget_min, budget_max, deadline_from, deadline_to,
+            model=ArchivedTender
+        )
+        archived_result = await db.execute(archived_query)
+        tenders.extend(archived_result.scalars().all())
+
+    if collapse_duplicates:
+        tenders = collapse_clusters(tenders)
 
     # Convert to response format
     response_tenders = []
     for tender in tenders:
         # Get documents
-        doc_result = await db.execute(select(TenderDocument).where(TenderDocument.tender_id == tender.id))
+        document_model = document_model_for(tender)
+        doc_result = await db.execute(select(document_model).where(document_model.tender_id == tender.id))
         documents = doc_result.scalars().all()
 
         response_tenders.append({
@@ -387,7 +473,8 @@ async def get_tenders(
                 } for doc in documents
             ],
             "source": tender.source,
-            "ocdsId": tender.ocds_id
+            "ocdsId": tender.ocds_id,
+            "duplicateOf": tender.duplicate_of
         })
 
     return response_tenders
@@ -395,14 +482,14 @@ async def get_tenders(
 @app.get("/api/tenders/{tender_id}", response_model=TenderResponse)
 async def get_tender(tender_id: str, db: AsyncSession = Depends(get_db)):
     """Get specific tender by ID"""
-    result = await db.execute(select(Tender).where(Tender.id == tender_id))
-    tender = result.scalars().first()
+    tender = await find_tender(db, tender_id)
 
     if not tender:
         raise HTTPException(status_code=404, detail="Tender not found")
 
     # Get documents
-    doc_result = await db.execute(select(TenderDocument).where(TenderDocument.tender_id == tender.id))
+    document_model = document_model_for(tender)
+    doc_result = await db.execute(select(document_model).where(document_model.tender_id == tender.id))
     documents = doc_result.scalars().all()
 
     return {
@@ -430,14 +517,47 @@ async def get_tender(tender_id: str, db: AsyncSession = Depends(get_db)):
             } for doc in documents
         ],
         "source": tender.source,
-        "ocdsId": tender.ocds_id
+        "ocdsId": tender.ocds_id,
+        "duplicateOf": tender.duplicate_of
     }
 
+@app.get("/api/documents/{document_id}")
+async def get_document(document_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Stream a tender document from the local cache, fetching it from the source on a miss"""
+    document = await find_document(db, document_id)
+
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    # Both get() and fetch() pin the file; document_response unpins it once sent
+    content_hash = document.content_hash
+    path = document_store.get(content_hash)
+    if path is None:
+        try:
+            content_hash, size, path = await document_store.fetch(document.url)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Could not fetch document from source")
+
+        try:
+            document.content_hash = content_hash
+            document.size = size
+            await db.commit()
+        except StaleDataError:
+            # The sweeper archived the document meanwhile; serve it without recording the hash
+            await db.rollback()
+        except BaseException:
+            document_store.release(content_hash)
+            raise
+
+    return document_response(
+        request, path, document.name, document.type,
+        release=lambda: document_store.release(content_hash)
+    )
+
 @app.post("/api/tenders/{tender_id}/analyze")
 async def analyze_tender(tender_id: str, db: AsyncSession = Depends(get_db)):
     """Generate AI analysis for a tender"""
-    result = await db.execute(select(Tender).where(Tender.id == tender_id))
-    tender = result.scalars().first()
+    tender = await find_tender(db, tender_id)
 
     if not tender:
         raise HTTPException(status_code=404, detail="Tender not found")
@@ -495,7 +615,7 @@ async def analyze_tender(tender_id: str, db: AsyncSession = Depends(get_db)):
     }
 
     # Save analysis to database
-    analysis_record = TenderAnalysis(
+    analysis_record = analysis_model_for(tender)(
         id=analysis["id"],
         tender_id=tender_id,
         organization_id=tender.organization_id,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -35,9 +35,8 @@ class Organization(Base):
     users = relationship("User", back_populates="organization")
     tenders = relationship("Tender", back_populates="organization")
 
-class Tender(Base):
-    __tablename__ = "tenders"
-
+class TenderColumns:
+    """Columns shared by the hot tenders table and its archive"""
     id = Column(String, primary_key=True, index=True)
     title = Column(String)
     description = Column(Text)
@@ -53,32 +52,63 @@ class Tender(Base):
     source = Column(String, default="ocds")
     ocds_id = Column(String, nullable=True)
     organization_id = Column(String, ForeignKey("organizations.id"))
+    minhash = Column(JSON, nullable=True)  # MinHash signature used for near-duplicate detection
+
+class Tender(TenderColumns, Base):
+    __tablename__ = "tenders"
+    __table_args__ = (
+        Index("ix_tenders_status_deadline", "status", "deadline"),
+    )
+
+    duplicate_of = Column(String, ForeignKey("tenders.id"), nullable=True, index=True)
 
     organization = relationship("Organization", back_populates="tenders")
     documents = relationship("TenderDocument", back_populates="tender")
     analyses = relationship("TenderAnalysis", back_populates="tender")
 
-class TenderDocument(Base):
-    __tablename__ = "tender_documents"
+class ArchivedTender(TenderColumns, Base):
+    """Cold storage for tenders that closed long ago"""
+    __tablename__ = "tenders_archive"
 
+    duplicate_of = Column(String, nullable=True)  # may point at a hot or archived tender
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class TenderDocumentColumns:
     id = Column(String, primary_key=True, index=True)
-    tender_id = Column(String, ForeignKey("tenders.id"))
     name = Column(String)
     url = Column(String)
     type = Column(String)
     size = Column(Integer)
+    content_hash = Column(String, nullable=True, index=True)  # SHA-256 of the cached file
+
+class TenderDocument(TenderDocumentColumns, Base):
+    __tablename__ = "tender_documents"
+
+    tender_id = Column(String, ForeignKey("tenders.id"))
 
     tender = relationship("Tender", back_populates="documents")
 
-class TenderAnalysis(Base):
-    __tablename__ = "tender_analyses"
+class ArchivedTenderDocument(TenderDocumentColumns, Base):
+    __tablename__ = "tender_documents_archive"
+
+    tender_id = Column(String, ForeignKey("tenders_archive.id"))
 
+class TenderAnalysisColumns:
     id = Column(String, primary_key=True, index=True)
-    tender_id = Column(String, ForeignKey("tenders.id"))
     organization_id = Column(String, ForeignKey("organizations.id"))
     summary = Column(JSON)
     readiness_score = Column(JSON)
     processed_at = Column(DateTime, default=datetime.utcnow)
     processing_time_ms = Column(Integer)
 
+class TenderAnalysis(TenderAnalysisColumns, Base):
+    __tablename__ = "tender_analyses"
+
+    tender_id = Column(String, ForeignKey("tenders.id"))
+
     tender = relationship("Tender", back_populates="analyses")
+
+class ArchivedTenderAnalysis(TenderAnalysisColumns, Base):
+    __tablename__ = "tender_analyses_archive"
+
+    tender_id = Column(String, ForeignKey("tenders_archive.id"))
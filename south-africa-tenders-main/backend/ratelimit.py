@@ -0,0 +1,220 @@
+import ipaddress
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Pattern, Sequence, Tuple, Union
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from auth import SECRET_KEY, ALGORITHM
+
+
+class Quota(NamedTuple):
+    rate: float  # tokens refilled per second
+    burst: float  # bucket capacity
+
+
+class RouteLimit(NamedTuple):
+    cost: float  # tokens charged per request
+    max_concurrency: int  # in-flight requests allowed across all callers
+
+
+PLAN_QUOTAS: Dict[str, Quota] = {
+    "anonymous": Quota(rate=0.5, burst=5),
+    "free": Quota(rate=1, burst=10),
+    "basic": Quota(rate=5, burst=30),
+}
+# Plans without an explicit entry (pro, enterprise, ...) get the top tier
+DEFAULT_QUOTA = Quota(rate=20, burst=100)
+
+ROUTE_LIMITS: List[Tuple[str, Pattern, RouteLimit]] = [
+    ("POST", re.compile(r"^/api/tenders/[^/]+/analyze$"), RouteLimit(cost=5, max_concurrency=8)),
+    ("GET", re.compile(r"^/api/tenders(/facets)?$"), RouteLimit(cost=1, max_concurrency=32)),
+    ("GET", re.compile(r"^/api/documents/[^/]+$"), RouteLimit(cost=1, max_concurrency=16)),
+]
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_trusted_proxies(value: str) -> List[IPNetwork]:
+    """Parse a comma-separated list of proxy addresses or networks; ``*`` trusts every peer"""
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if item == "*":
+            networks.extend([ipaddress.ip_network("0.0.0.0/0"), ipaddress.ip_network("::/0")])
+        elif item:
+            networks.append(ipaddress.ip_network(item, strict=False))
+    return networks
+
+
+# Reverse proxies whose X-Forwarded-For header is believed when keying anonymous
+# callers, e.g. "10.0.0.0/8,127.0.0.1". Leave empty when the app is reached
+# directly, or when uvicorn already rewrites the client address itself
+# (--proxy-headers with --forwarded-allow-ips).
+TRUSTED_PROXIES = parse_trusted_proxies(os.getenv("TRUSTED_PROXIES", ""))
+
+MAX_BUCKETS = 10_000
+# Long enough for every tier to refill completely, so dropping an idle bucket loses nothing
+BUCKET_IDLE_SECONDS = 600
+
+
+def quota_for_plan(plan: Optional[str]) -> Quota:
+    if plan is None:
+        return PLAN_QUOTAS["anonymous"]
+    return PLAN_QUOTAS.get(plan, DEFAULT_QUOTA)
+
+
+def match_route(method: str, path: str) -> Optional[Tuple[Pattern, RouteLimit]]:
+    for route_method, pattern, limit in ROUTE_LIMITS:
+        if method == route_method and pattern.match(path):
+            return pattern, limit
+    return None
+
+
+def _is_trusted(address: str, trusted: Sequence[IPNetwork]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_address(scope: Scope) -> str:
+    """The caller's address, read through X-Forwarded-For when the peer is a trusted proxy.
+
+    Hops are walked from the right and the first untrusted one wins, since
+    anything further left was supplied by the client and can be forged.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _is_trusted(address, TRUSTED_PROXIES):
+        return address
+    hops = []
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            hops.extend(hop.strip() for hop in value.decode("latin-1").split(","))
+    for hop in reversed([hop for hop in hops if hop]):
+        address = hop
+        if not _is_trusted(hop, TRUSTED_PROXIES):
+            break
+    return address
+
+
+def identify_client(scope: Scope) -> Tuple[str, Optional[str]]:
+    """Return the rate-limit key and plan for a request.
+
+    Authenticated callers are keyed by organization (falling back to the JWT
+    subject); everyone else is keyed by client address on the anonymous quota.
+    Behind a reverse proxy, set ``TRUSTED_PROXIES`` so anonymous callers are
+    not all keyed by the proxy's address.
+    """
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                break
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                break
+            org = payload.get("org")
+            subject = payload.get("sub")
+            if org:
+                return f"org:{org}", payload.get("plan", "free")
+            if subject:
+                return f"sub:{subject}", payload.get("plan", "free")
+            break
+    return f"ip:{client_address(scope)}", None
+
+
+class RateLimiter:
+    """Per-key token buckets.
+
+    All state is plain dicts mutated without awaiting, so on the single event
+    loop thread each check is atomic without taking a lock. Buckets are kept
+    in least-recently-used order so idle ones can be dropped from the front.
+    """
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS, idle_seconds: float = BUCKET_IDLE_SECONDS):
+        self.max_buckets = max_buckets
+        self.idle_seconds = idle_seconds
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def acquire(self, key: str, quota: Quota, cost: float) -> float:
+        """Charge ``cost`` tokens; return 0 on success or seconds until it would succeed"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._make_room(now)
+            bucket = self._buckets[key] = [quota.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(quota.burst, bucket[0] + (now - bucket[1]) * quota.rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return 0.0
+        bucket[0] = tokens
+        return (cost - tokens) / quota.rate
+
+    def _make_room(self, now: float):
+        """Drop idle buckets, then the least recently used one if still at capacity"""
+        while self._buckets:
+            _, last = next(iter(self._buckets.values()))
+            if len(self._buckets) < self.max_buckets and now - last <= self.idle_seconds:
+                break
+            self._buckets.popitem(last=False)
+
+
+class RateLimitMiddleware:
+    """Admission control for expensive endpoints.
+
+    Requests matching ``ROUTE_LIMITS`` are charged against their organization's
+    token bucket (429 when empty) and against a per-route concurrency cap (503
+    when saturated). Both rejections carry a Retry-After header.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or RateLimiter()
+        self.in_flight: Dict[Pattern, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = match_route(scope["method"], scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        pattern, limit = route
+
+        if self.in_flight.get(pattern, 0) >= limit.max_concurrency:
+            await self._reject(scope, receive, send, 503, "Service busy, please retry", 1)
+            return
+
+        key, plan = identify_client(scope)
+        retry_after = self.limiter.acquire(key, quota_for_plan(plan), limit.cost)
+        if retry_after:
+            await self._reject(scope, receive, send, 429, "Rate limit exceeded", retry_after)
+            return
+
+        self.in_flight[pattern] = self.in_flight.get(pattern, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[pattern] -= 1
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, detail: str, retry_after: float):
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Backend modules import each other as top-level modules (``from models import ...``)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_tmp = tempfile.mkdtemp(prefix="tender-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp}/tenders.db")
+os.environ.setdefault("DOCUMENT_CACHE_DIR", os.path.join(_tmp, "document_cache"))
+
+
+async def _no_sweeper():
+    pass
+
+
+@pytest.fixture(autouse=True)
+def no_background_sweeper(monkeypatch):
+    """Tests drive archiving themselves; keep the lifespan sweeper from racing them"""
+    import main
+    monkeypatch.setattr(main, "run_sweeper", _no_sweeper)
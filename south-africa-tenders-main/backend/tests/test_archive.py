@@ -0,0 +1,201 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+import archive
+import main
+from auth import create_access_token
+from database import get_db
+from dedup import tender_index
+from models import (
+    Base, Organization, Tender, ArchivedTender, TenderDocument, ArchivedTenderDocument, TenderAnalysis,
+    ArchivedTenderAnalysis,
+)
+
+LONG_AGO = datetime.utcnow() - timedelta(days=700)
+NEXT_MONTH = datetime.utcnow() + timedelta(days=30)
+
+
+def _enable_foreign_keys(dbapi_connection, _):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # A sweep archives every expired tender it finds, including the seeded ones
+    # other test modules use, so archiving runs against a database of its own.
+    # Engines mirror database.py: one shared connection for requests, fresh
+    # connections for the sweeper.
+    url = f"sqlite+aiosqlite:///{tmp_path}/archive.db"
+    request_engine = create_async_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    sweeper_engine = create_async_engine(url, poolclass=NullPool)
+    # Enforce foreign keys on the sweeper's connections, as a non-SQLite database would
+    event.listen(sweeper_engine.sync_engine, "connect", _enable_foreign_keys)
+    session = sessionmaker(request_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(archive, "background_session",
+                        sessionmaker(sweeper_engine, class_=AsyncSession, expire_on_commit=False))
+
+    async def get_archive_db():
+        async with session() as db:
+            yield db
+
+    async def create_schema():
+        async with request_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session() as db:
+            db.add(Organization(id="sample-org", name="Sample Organization"))
+            await db.commit()
+
+    main.app.dependency_overrides[get_db] = get_archive_db
+    try:
+        with TestClient(main.app) as client:
+            client.portal.call(create_schema)
+            token = create_access_token({"sub": "archive@example.com", "org": uuid.uuid4().hex, "plan": "pro"})
+            client.headers["Authorization"] = f"Bearer {token}"
+            client.session = session
+            yield client
+            client.portal.call(request_engine.dispose)
+            client.portal.call(sweeper_engine.dispose)
+    finally:
+        main.app.dependency_overrides.pop(get_db, None)
+
+
+def make_tender(tender_id, **overrides):
+    values = dict(
+        id=tender_id, title="Catering services", description="Catering for staff events",
+        buyer="Department of Health", province="Gauteng", budget_min=1, budget_max=2,
+        deadline=LONG_AGO, published_date=LONG_AGO, status="closed", categories=["Services"],
+        source="ocds", organization_id="sample-org",
+    )
+    values.update(overrides)
+    return Tender(**values)
+
+
+async def archive_now():
+    _, archived = await archive.sweep_tenders()
+    return archived
+
+
+async def count(session, model, *conditions):
+    async with session() as db:
+        result = await db.execute(select(func.count()).select_from(model).where(*conditions))
+        return result.scalar()
+
+
+def test_archiving_moves_dependents_and_reassigns_duplicates(client):
+    prefix = uuid.uuid4().hex[:8]
+    old, first_dup, second_dup = f"{prefix}-old", f"{prefix}-dup-1", f"{prefix}-dup-2"
+
+    async def setup():
+        async with client.session() as db:
+            db.add(make_tender(old))
+            db.add(make_tender(first_dup, status="open", deadline=NEXT_MONTH,
+                               published_date=LONG_AGO + timedelta(days=1), duplicate_of=old))
+            db.add(make_tender(second_dup, status="open", deadline=NEXT_MONTH,
+                               published_date=LONG_AGO + timedelta(days=2), duplicate_of=old))
+            db.add(TenderDocument(id=f"{prefix}-doc", tender_id=old, name="spec.pdf",
+                                  url="http://example.invalid/spec.pdf", type="pdf", size=1))
+            db.add(TenderAnalysis(id=f"{prefix}-analysis", tender_id=old, organization_id="sample-org",
+                                  summary={}, readiness_score={}, processing_time_ms=1))
+            await db.commit()
+        for tender_id in (old, first_dup, second_dup):
+            tender_index.insert(tender_id, [0] * 128, None if tender_id == old else old)
+
+    client.portal.call(setup)
+    assert client.portal.call(archive_now) == 1
+
+    assert client.portal.call(count, client.session, Tender, Tender.id == old) == 0
+    assert client.portal.call(count, client.session, ArchivedTender, ArchivedTender.id == old) == 1
+    assert client.portal.call(count, client.session, TenderDocument, TenderDocument.tender_id == old) == 0
+    assert client.portal.call(count, client.session, ArchivedTenderDocument, ArchivedTenderDocument.tender_id == old) == 1
+    assert client.portal.call(count, client.session, ArchivedTenderAnalysis, ArchivedTenderAnalysis.tender_id == old) == 1
+
+    first = client.get(f"/api/tenders/{first_dup}").json()
+    second = client.get(f"/api/tenders/{second_dup}").json()
+    assert first["duplicateOf"] is None
+    assert second["duplicateOf"] == first_dup
+    assert old not in tender_index.signatures
+    assert tender_index.clusters[second_dup] == first_dup
+
+    archived = client.get(f"/api/tenders/{old}")
+    assert archived.status_code == 200
+    assert [doc["id"] for doc in archived.json()["documents"]] == [f"{prefix}-doc"]
+    assert client.post(f"/api/tenders/{old}/analyze").status_code == 200
+    assert client.portal.call(count, client.session, ArchivedTenderAnalysis, ArchivedTenderAnalysis.id == f"ai-{old}") == 1
+
+
+def test_reingested_tender_replaces_its_archived_copy(client):
+    prefix = uuid.uuid4().hex[:8]
+    tender_id, doc_id, old_doc_id = f"{prefix}-tender", f"{prefix}-doc", f"{prefix}-old-doc"
+
+    async def setup():
+        async with client.session() as db:
+            stale = make_tender(tender_id, title="Old version")
+            db.add(ArchivedTender(archived_at=LONG_AGO, **{
+                column.name: getattr(stale, column.name) for column in Tender.__table__.columns
+            }))
+            db.add(ArchivedTenderDocument(id=doc_id, tender_id=tender_id, name="old.pdf",
+                                          url="http://example.invalid/old.pdf", type="pdf", size=1))
+            db.add(ArchivedTenderDocument(id=old_doc_id, tender_id=tender_id, name="notice.pdf",
+                                          url="http://example.invalid/notice.pdf", type="pdf", size=1))
+            await db.commit()
+            db.add(make_tender(tender_id, title="New version"))
+            db.add(TenderDocument(id=doc_id, tender_id=tender_id, name="new.pdf",
+                                  url="http://example.invalid/new.pdf", type="pdf", size=2))
+            await db.commit()
+
+    client.portal.call(setup)
+    assert client.portal.call(archive_now) == 1
+
+    assert client.portal.call(count, client.session, Tender, Tender.id == tender_id) == 0
+    assert client.portal.call(count, client.session, TenderDocument, TenderDocument.id == doc_id) == 0
+    archived = client.get(f"/api/tenders/{tender_id}").json()
+    assert archived["title"] == "New version"
+    documents = {doc["id"]: doc["name"] for doc in archived["documents"]}
+    assert documents == {doc_id: "new.pdf", old_doc_id: "notice.pdf"}
+
+
+def test_concurrent_request_sessions_do_not_lose_tenders(client, monkeypatch):
+    monkeypatch.setattr(archive, "SWEEP_BATCH_SIZE", 20)
+    prefix = uuid.uuid4().hex[:8]
+    ids = [f"{prefix}-{i}" for i in range(200)]
+
+    async def setup():
+        async with client.session() as db:
+            for tender_id in ids:
+                db.add(make_tender(tender_id))
+            await db.commit()
+
+    async def archive_under_load():
+        stop = asyncio.Event()
+
+        async def reader():
+            while not stop.is_set():
+                async with client.session() as db:
+                    await db.execute(select(Tender.id).limit(1))
+                    await asyncio.sleep(0)
+                await asyncio.sleep(0)
+
+        readers = [asyncio.create_task(reader()) for _ in range(4)]
+        try:
+            return await archive_now()
+        finally:
+            stop.set()
+            await asyncio.gather(*readers)
+
+    client.portal.call(setup)
+    archived = client.portal.call(archive_under_load)
+
+    assert archived == len(ids)
+    assert client.portal.call(count, client.session, Tender, Tender.id.in_(ids)) == 0
+    assert client.portal.call(count, client.session, ArchivedTender, ArchivedTender.id.in_(ids)) == len(ids)
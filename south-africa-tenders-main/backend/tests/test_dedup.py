@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+import dedup
+from dedup import LSHIndex, collapse_clusters, rebuild_index, register_tender, tender_signature
+from models import Base, Tender
+
+ICT_DESCRIPTION = (
+    "Supply, installation and configuration of ICT equipment including computers, "
+    "servers, networking equipment for municipal offices."
+)
+
+
+def make_tender(tender_id, title="ICT Equipment Supply and Installation",
+                description=ICT_DESCRIPTION, buyer="eThekwini Municipality"):
+    return Tender(id=tender_id, title=title, description=description, buyer=buyer)
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(dedup, "tender_index", LSHIndex())
+
+
+@pytest.mark.parametrize("republished", [
+    make_tender("re-1", description=ICT_DESCRIPTION + " Closing date extended."),
+    make_tender("re-2", description=ICT_DESCRIPTION.replace("municipal", "provincial")),
+    make_tender("re-3", title="ICT Equipment Supply and Installation (Re-advertisement)"),
+])
+def test_small_edits_are_linked_to_original(republished):
+    register_tender(make_tender("original"))
+    assert register_tender(republished) == "original"
+    assert republished.duplicate_of == "original"
+
+
+def test_distinct_tender_from_same_template_is_not_linked():
+    register_tender(make_tender("original"))
+    other = make_tender(
+        "other",
+        description="Supply, installation and configuration of ICT equipment including "
+                    "laptops and printers for school libraries.",
+        buyer="KwaZulu-Natal Department of Education",
+    )
+    assert register_tender(other) is None
+
+
+def test_tenders_without_text_are_not_clustered():
+    first = make_tender("empty-1", title="", description=None, buyer="")
+    second = make_tender("empty-2", title="", description=None, buyer="")
+    assert tender_signature(first) is None
+    assert register_tender(first) is None
+    assert register_tender(second) is None
+    assert second.duplicate_of is None
+    assert "empty-1" not in dedup.tender_index.signatures
+
+
+def test_collapse_keeps_canonical_tender():
+    original = make_tender("original")
+    copy = make_tender("copy", description=ICT_DESCRIPTION + " Closing date extended.")
+    register_tender(original)
+    register_tender(copy)
+    assert collapse_clusters([copy, original]) == [original]
+
+
+def test_rebuild_index_clusters_backfilled_signatures():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        published = datetime(2024, 1, 1)
+        async with AsyncSession(engine) as db:
+            for offset, tender in enumerate([
+                make_tender("original"),
+                make_tender("copy", description=ICT_DESCRIPTION + " Closing date extended."),
+                make_tender("empty", title="", description=None, buyer=""),
+            ]):
+                tender.published_date = published + timedelta(days=offset)
+                db.add(tender)
+            await db.commit()
+
+            await rebuild_index(db)
+            result = await db.execute(select(Tender.id, Tender.minhash, Tender.duplicate_of).order_by(Tender.id))
+            rows = {tender_id: (minhash, duplicate_of) for tender_id, minhash, duplicate_of in result.all()}
+        await engine.dispose()
+        return rows
+
+    rows = asyncio.run(run())
+    assert rows["original"][0] and rows["original"][1] is None
+    assert rows["copy"][0] and rows["copy"][1] == "original"
+    assert rows["empty"] == (None, None)
+    assert dedup.tender_index.clusters == {"original": "original", "copy": "original"}
@@ -0,0 +1,200 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from auth import create_access_token
+from database import async_session
+from documents import DocumentStore, parse_range
+from models import TenderDocument
+
+DOC_SIZE = 100 * 1024
+
+
+class StubPortal(BaseHTTPRequestHandler):
+    """Stands in for a slow government portal serving tender documents"""
+
+    files = {}
+
+    def do_GET(self):
+        time.sleep(0.05)
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def portal():
+    StubPortal.files = {f"/doc-{i}.pdf": os.urandom(DOC_SIZE) for i in range(6)}
+    StubPortal.files["/copy-of-doc-0.pdf"] = StubPortal.files["/doc-0.pdf"]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPortal)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", StubPortal.files
+    server.shutdown()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(str(tmp_path / "cache"), max_bytes=int(DOC_SIZE * 1.5))
+    store.load()
+    return store
+
+
+@pytest.fixture
+def client(portal, store, monkeypatch):
+    base_url, _ = portal
+    monkeypatch.setattr(main, "document_store", store)
+    with TestClient(main.app) as client:
+        # A fresh organization per test keeps the rate limiter out of the way
+        token = create_access_token({"sub": "docs@example.com", "org": uuid.uuid4().hex, "plan": "pro"})
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        async def add_documents():
+            async with async_session() as db:
+                for path in StubPortal.files:
+                    doc_id = f"{path.strip('/')}-{uuid.uuid4().hex[:8]}"
+                    db.add(TenderDocument(id=doc_id, tender_id="tender-1", name=path.strip("/"),
+                                          url=base_url + path, type="pdf", size=0))
+                    client.doc_ids[path] = doc_id
+                db.add(TenderDocument(id=f"missing-{uuid.uuid4().hex[:8]}", tender_id="tender-1",
+                                      name="missing.pdf", url=base_url + "/missing.pdf", type="pdf", size=0))
+                await db.commit()
+
+        client.doc_ids = {}
+        client.portal.call(add_documents)
+        yield client
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-5", 100) == (95, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    for header, size in (("bytes=100-", 100), ("bytes=-5", 0), ("bytes=0-", 0), ("bytes=0-9", 0)):
+        with pytest.raises(HTTPException) as excinfo:
+            parse_range(header, size)
+        assert excinfo.value.status_code == 416
+        assert excinfo.value.headers["Content-Range"] == f"bytes */{size}"
+
+
+def test_full_and_partial_responses(client, portal):
+    _, files = portal
+    doc_id = client.doc_ids["/doc-1.pdf"]
+    body = files["/doc-1.pdf"]
+
+    response = client.get(f"/api/documents/{doc_id}")
+    assert response.status_code == 200
+    assert response.content == body
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = client.get(f"/api/documents/{doc_id}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == body[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{DOC_SIZE}"
+
+    response = client.get(f"/api/documents/{doc_id}", headers={"Range": f"bytes={DOC_SIZE}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{DOC_SIZE}"
+    assert main.document_store._pins == {}
+
+
+def test_upstream_error_returns_502(client):
+    missing = client.get("/api/documents/nope")
+    assert missing.status_code == 404
+    doc_id = next(d for d in client.portal.call(_document_ids) if d.startswith("missing-"))
+    assert client.get(f"/api/documents/{doc_id}").status_code == 502
+
+
+async def _document_ids():
+    from sqlalchemy.future import select
+    async with async_session() as db:
+        result = await db.execute(select(TenderDocument.id))
+        return result.scalars().all()
+
+
+def test_identical_documents_are_stored_once(store, portal):
+    base_url, _ = portal
+
+    async def fetch_both():
+        first = await store.fetch(base_url + "/doc-0.pdf")
+        second = await store.fetch(base_url + "/copy-of-doc-0.pdf")
+        return first, second
+
+    first, second = asyncio.run(fetch_both())
+    assert first[0] == second[0]
+    assert store.total_bytes == DOC_SIZE
+
+
+def test_lru_eviction_respects_size_cap(store, portal):
+    base_url, _ = portal
+
+    async def fetch_in_turn():
+        hashes = []
+        for i in range(3):
+            content_hash, _, _ = await store.fetch(f"{base_url}/doc-{i}.pdf")
+            store.release(content_hash)
+            hashes.append(content_hash)
+        return hashes
+
+    hashes = asyncio.run(fetch_in_turn())
+    assert store.total_bytes <= store.max_bytes
+    assert not store.path_for(hashes[0]).exists()
+    assert store.path_for(hashes[2]).exists()
+
+
+def test_waiter_cancelled_after_failed_download(store, portal):
+    base_url, files = portal
+    url = base_url + "/missing.pdf"
+
+    async def run():
+        waiter = asyncio.ensure_future(store.fetch(url))
+        await asyncio.sleep(0)
+        download = store._inflight[url]
+        # Cancel the waiter as the download fails, before it has resumed
+        download.add_done_callback(lambda _: waiter.cancel())
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # A retry of the URL starts a clean download with its own waiter count
+        content_hash, _, path = await store.fetch(base_url + "/doc-1.pdf")
+        assert path.read_bytes() == files["/doc-1.pdf"]
+        store.release(content_hash)
+
+    asyncio.run(run())
+    assert store._waiters == {}
+    assert store._inflight == {}
+    assert store._pins == {}
+
+
+def test_concurrent_misses_are_all_served(client, portal):
+    _, files = portal
+    paths = [f"/doc-{i}.pdf" for i in range(6)]
+
+    async def fetch_all():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test", headers=client.headers) as http:
+            return await asyncio.gather(*(http.get(f"/api/documents/{client.doc_ids[p]}") for p in paths))
+
+    responses = client.portal.call(fetch_all)
+    assert [r.status_code for r in responses] == [200] * len(paths)
+    assert all(r.content == files[p] for r, p in zip(responses, paths))
+    assert main.document_store._pins == {}
+    assert main.document_store.total_bytes <= main.document_store.max_bytes
@@ -0,0 +1,108 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import facets
+import main
+from auth import create_access_token
+from database import async_session
+from facets import FacetCache, budget_bucket
+from models import Tender, ArchivedTender
+
+NEXT_MONTH = datetime.utcnow() + timedelta(days=30)
+
+
+@pytest.mark.parametrize("budget_max, label", [
+    (None, "unknown"),
+    (0, "0-1M"),
+    (999_999.99, "0-1M"),
+    (1_000_000, "1M-5M"),
+    (4_999_999, "1M-5M"),
+    (5_000_000, "5M-10M"),
+    (10_000_000, "10M-50M"),
+    (50_000_000, "50M+"),
+    (1e12, "50M+"),
+])
+def test_budget_bucket_edges(budget_max, label):
+    assert budget_bucket(budget_max) == label
+
+
+def test_facet_cache_hit_expiry_and_size_cap(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(facets.time, "monotonic", lambda: now[0])
+    cache = FacetCache(ttl=30, max_entries=2)
+
+    cache.set("a", {"total": 1})
+    assert cache.get("a") == {"total": 1}
+    now[0] += 31
+    assert cache.get("a") is None
+
+    cache.set("a", {"total": 1})
+    cache.set("b", {"total": 2})
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", {"total": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"total": 1}
+    assert cache.get("c") == {"total": 3}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "facet_cache", FacetCache())
+    with TestClient(main.app) as client:
+        token = create_access_token({"sub": "facets@example.com", "org": uuid.uuid4().hex, "plan": "pro"})
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def make_row(model, province, **overrides):
+    values = dict(
+        id=f"facets-{uuid.uuid4().hex[:8]}", title="Office cleaning", description="Cleaning services",
+        buyer="City of Tshwane", province=province, budget_min=0, deadline=NEXT_MONTH,
+        published_date=datetime.utcnow(), status="open", source="ocds", organization_id="sample-org",
+    )
+    values.update(overrides)
+    return model(**values)
+
+
+def test_facet_counts_for_filter_set(client):
+    # A province of our own keeps rows from other tests out of the counts
+    province, elsewhere = f"Facetland-{uuid.uuid4().hex[:8]}", f"Elsewhere-{uuid.uuid4().hex[:8]}"
+
+    async def add_rows():
+        async with async_session() as db:
+            db.add_all([
+                make_row(Tender, province, categories=["Services", "Maintenance"], budget_max=500_000),
+                make_row(Tender, province, categories=["Services"], budget_max=1_000_000),
+                make_row(Tender, province, categories=["Services", "Services"], budget_max=None, status="closed"),
+                make_row(Tender, elsewhere, categories=["ICT"], budget_max=2_000_000),
+                make_row(ArchivedTender, province, categories=["Construction"], budget_max=75_000_000,
+                         status="awarded", archived_at=datetime.utcnow()),
+            ])
+            await db.commit()
+
+    client.portal.call(add_rows)
+
+    response = client.get("/api/tenders/facets", params={"provinces": province})
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 3,
+        "provinces": {province: 3},
+        "categories": {"Services": 3, "Maintenance": 1},
+        "status": {"open": 2, "closed": 1},
+        "budget": {"0-1M": 1, "1M-5M": 1, "unknown": 1},
+    }
+
+    response = client.get("/api/tenders/facets", params={"provinces": f"{province},{elsewhere}"})
+    assert response.json()["provinces"] == {province: 3, elsewhere: 1}
+
+    response = client.get("/api/tenders/facets", params={"provinces": province, "include_archived": "true"})
+    assert response.json() == {
+        "total": 4,
+        "provinces": {province: 4},
+        "categories": {"Services": 3, "Maintenance": 1, "Construction": 1},
+        "status": {"open": 2, "closed": 1, "awarded": 1},
+        "budget": {"0-1M": 1, "1M-5M": 1, "50M+": 1, "unknown": 1},
+    }
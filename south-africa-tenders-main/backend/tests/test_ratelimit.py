@@ -0,0 +1,129 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import ratelimit
+from ratelimit import (
+    Quota, RateLimiter, RateLimitMiddleware, RouteLimit, identify_client, match_route, parse_trusted_proxies,
+    quota_for_plan, PLAN_QUOTAS, DEFAULT_QUOTA,
+)
+
+QUOTA = Quota(rate=1, burst=3)
+
+
+def test_bucket_exhausts_and_reports_retry_after():
+    limiter = RateLimiter()
+    assert [limiter.acquire("org:a", QUOTA, 1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = limiter.acquire("org:a", QUOTA, 1)
+    assert 0 < retry_after <= 1
+    assert limiter.acquire("org:b", QUOTA, 1) == 0.0
+
+
+def test_flooding_new_keys_does_not_reset_active_buckets():
+    limiter = RateLimiter(max_buckets=100)
+    for _ in range(3):
+        limiter.acquire("org:victim", QUOTA, 1)
+    assert limiter.acquire("org:victim", QUOTA, 1) > 0
+
+    for i in range(1000):
+        limiter.acquire(f"ip:10.0.{i // 256}.{i % 256}", QUOTA, 1)
+        # The victim stays active, so it is never the least recently used bucket
+        if i % 50 == 0:
+            limiter.acquire("org:victim", QUOTA, 1)
+
+    assert len(limiter._buckets) <= 100
+    assert limiter.acquire("org:victim", QUOTA, 1) > 0
+
+
+def test_plan_quotas_and_routes():
+    assert quota_for_plan(None) == PLAN_QUOTAS["anonymous"]
+    assert quota_for_plan("basic") == PLAN_QUOTAS["basic"]
+    assert quota_for_plan("pro") == DEFAULT_QUOTA
+    assert match_route("POST", "/api/tenders/tender-1/analyze")[1].cost == 5
+    assert match_route("GET", "/api/tenders/tender-1") is None
+
+
+LIMITED = re.compile(r"^/limited$")
+SLOW = re.compile(r"^/slow$")
+BOOM = re.compile(r"^/boom$")
+
+
+@pytest.fixture
+def middleware(monkeypatch):
+    monkeypatch.setattr(ratelimit, "ROUTE_LIMITS", [
+        ("GET", LIMITED, RouteLimit(cost=1, max_concurrency=8)),
+        ("GET", SLOW, RouteLimit(cost=0, max_concurrency=1)),
+        ("GET", BOOM, RouteLimit(cost=0, max_concurrency=1)),
+    ])
+    release_slow = asyncio.Event()
+
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    async def slow(request):
+        await release_slow.wait()
+        return PlainTextResponse("ok")
+
+    async def boom(request):
+        raise RuntimeError("boom")
+
+    app = Starlette(routes=[Route("/limited", ok), Route("/slow", slow), Route("/boom", boom)])
+    middleware = RateLimitMiddleware(app, limiter=RateLimiter())
+    middleware.release_slow = release_slow
+    return middleware
+
+
+def test_exhausted_bucket_returns_429_with_retry_after(middleware):
+    client = TestClient(middleware)
+    burst = int(PLAN_QUOTAS["anonymous"].burst)
+    assert [client.get("/limited").status_code for _ in range(burst)] == [200] * burst
+    response = client.get("/limited")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+
+def test_saturated_route_returns_503_with_retry_after(middleware):
+    async def run():
+        async with httpx.AsyncClient(app=middleware, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.get("/slow"))
+            while not middleware.in_flight.get(SLOW):
+                await asyncio.sleep(0.01)
+            busy = await client.get("/slow")
+            middleware.release_slow.set()
+            return busy, await first
+
+    busy, first = asyncio.run(run())
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+    assert first.status_code == 200
+    assert middleware.in_flight[SLOW] == 0
+
+
+def test_in_flight_is_released_when_the_app_raises(middleware):
+    client = TestClient(middleware)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            client.get("/boom")
+        assert middleware.in_flight[BOOM] == 0
+
+
+def test_forwarded_for_is_only_trusted_from_configured_proxies(monkeypatch):
+    def scope(peer, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return {"type": "http", "client": (peer, 1234), "headers": headers}
+
+    assert identify_client(scope("10.0.0.5", "203.0.113.7")) == ("ip:10.0.0.5", None)
+
+    monkeypatch.setattr(ratelimit, "TRUSTED_PROXIES", parse_trusted_proxies("10.0.0.0/8, 127.0.0.1"))
+    assert identify_client(scope("10.0.0.5", "203.0.113.7")) == ("ip:203.0.113.7", None)
+    # A client-supplied hop left of the real client is ignored, as are trusted hops
+    assert identify_client(scope("10.0.0.5", "198.51.100.1, 203.0.113.7, 10.0.0.9")) == ("ip:203.0.113.7", None)
+    # Untrusted peers cannot pick their own key
+    assert identify_client(scope("192.0.2.1", "203.0.113.7")) == ("ip:192.0.2.1", None)
+    assert identify_client(scope("10.0.0.5")) == ("ip:10.0.0.5", None)
@@ -8,7 +8,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Checkbox } from '@/components/ui/checkbox';
 import { useToast } from '@/hooks/use-toast';
 import { Tender, SearchFilters } from '@/types';
-import { tendersAPI } from '@/services/api';
+import { tendersAPI, TenderFacets } from '@/services/api';
 import { 
   Search as SearchIcon, 
   Filter, 
@@ -38,6 +38,7 @@ export default function Search() {
   const [searchQuery, setSearchQuery] = useState('');
   const [filters, setFilters] = useState<SearchFilters>({});
   const [filteredTenders, setFilteredTenders] = useState<Tender[]>([]);
+  const [facets, setFacets] = useState<TenderFacets | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [showFilters, setShowFilters] = useState(false);
   const { toast } = useToast();
@@ -66,8 +67,13 @@ export default function Search() {
         ...filters
       };
       
-      const results = await tendersAPI.getTenders(searchFilters);
+      // Facet counts are a nice-to-have; a failure there must not fail the search
+      const [results, facetCounts] = await Promise.all([
+        tendersAPI.getTenders(searchFilters),
+        tendersAPI.getFacets(searchFilters).catch(() => null),
+      ]);
       setFilteredTenders(results);
+      setFacets(facetCounts);
       
       toast({
         title: "Search completed",
@@ -241,6 +247,9 @@ export default function Search() {
                       />
                       <Label htmlFor={`province-${province}`} className="text-sm font-normal">
                         {province}
+                        {facets && (
+                          <span className="ml-1 text-muted-foreground">({facets.provinces[province] || 0})</span>
+                        )}
                       </Label>
                     </div>
                   ))}
@@ -260,6 +269,9 @@ export default function Search() {
                       />
                       <Label htmlFor={`category-${category}`} className="text-sm font-normal">
                         {category}
+                        {facets && (
+                          <span className="ml-1 text-muted-foreground">({facets.categories[category] || 0})</span>
+                        )}
                       </Label>
                     </div>
                   ))}
@@ -70,6 +70,28 @@ export interface AIAnalysisResult {
   processingTimeMs: number;
 }
 
+export interface TenderFacets {
+  total: number;
+  provinces: Record<string, number>;
+  categories: Record<string, number>;
+  status: Record<string, number>;
+  budget: Record<string, number>;
+}
+
+const buildTenderParams = (filters?: SearchFilters): URLSearchParams => {
+  const params = new URLSearchParams();
+
+  if (filters?.keywords) params.append('keywords', filters.keywords);
+  if (filters?.provinces?.length) params.append('provinces', filters.provinces.join(','));
+  if (filters?.categories?.length) params.append('categories', filters.categories.join(','));
+  if (filters?.budgetMin) params.append('budget_min', filters.budgetMin.toString());
+  if (filters?.budgetMax) params.append('budget_max', filters.budgetMax.toString());
+  if (filters?.deadlineFrom) params.append('deadline_from', filters.deadlineFrom);
+  if (filters?.deadlineTo) params.append('deadline_to', filters.deadlineTo);
+
+  return params;
+};
+
 // Auth API
 export const authAPI = {
   login: async (email: string, password: string): Promise<LoginResponse> => {
@@ -86,20 +108,17 @@ export const authAPI = {
 // Tenders API
 export const tendersAPI = {
   getTenders: async (filters?: SearchFilters): Promise<Tender[]> => {
-    const params = new URLSearchParams();
-    
-    if (filters?.keywords) params.append('keywords', filters.keywords);
-    if (filters?.provinces?.length) params.append('provinces', filters.provinces.join(','));
-    if (filters?.categories?.length) params.append('categories', filters.categories.join(','));
-    if (filters?.budgetMin) params.append('budget_min', filters.budgetMin.toString());
-    if (filters?.budgetMax) params.append('budget_max', filters.budgetMax.toString());
-    if (filters?.deadlineFrom) params.append('deadline_from', filters.deadlineFrom);
-    if (filters?.deadlineTo) params.append('deadline_to', filters.deadlineTo);
-
+    const params = buildTenderParams(filters);
     const response = await api.get(`/tenders?${params.toString()}`);
     return response.data;
   },
 
+  getFacets: async (filters?: SearchFilters): Promise<TenderFacets> => {
+    const params = buildTenderParams(filters);
+    const response = await api.get(`/tenders/facets?${params.toString()}`);
+    return response.data;
+  },
+
   getTender: async (id: string): Promise<Tender> => {
     const response = await api.get(`/tenders/${id}`);
     return response.data;
@@ -62,6 +62,7 @@ export interface Tender {
   documents?: TenderDocument[];
   source: 'ocds' | 'manual';
   ocdsId?: string;
+  duplicateOf?: string;
 }
 
 export interface TenderDocument {